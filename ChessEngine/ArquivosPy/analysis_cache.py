@@ -0,0 +1,185 @@
+# analysis_cache.py
+import sqlite3
+import hashlib
+import json
+import chess
+import chess.polyglot
+
+class AnalysisCache:
+    """
+    Cache persistente (SQLite) de resultados de busca, compartilhado entre execuções.
+
+    Cada entrada é indexada por (hash Zobrist da posição, profundidade, impressão digital
+    dos parâmetros PST). Como a impressão digital faz parte da chave, qualquer mudança
+    nas tabelas carregadas por `Engine.load_parameters` invalida automaticamente as
+    entradas antigas, que deixam de ser consultadas e acabam removidas pela evicção.
+    """
+
+    def __init__(self, db_file='analysis_cache.db', max_entries=200000):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis (
+                   position_hash INTEGER NOT NULL,
+                   depth INTEGER NOT NULL,
+                   params_fingerprint TEXT NOT NULL,
+                   score REAL NOT NULL,
+                   best_move TEXT,
+                   last_used INTEGER NOT NULL,
+                   PRIMARY KEY (position_hash, depth, params_fingerprint)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON analysis (last_used)")
+        # Resultados multi-PV: `lines` guarda, em JSON, [score, [lances UCI da variante]] de cada lance
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_multipv (
+                   position_hash INTEGER NOT NULL,
+                   depth INTEGER NOT NULL,
+                   params_fingerprint TEXT NOT NULL,
+                   num_pv INTEGER NOT NULL,
+                   lines TEXT NOT NULL,
+                   last_used INTEGER NOT NULL,
+                   PRIMARY KEY (position_hash, depth, params_fingerprint)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_multipv_last_used ON analysis_multipv (last_used)")
+        self._clock = 0
+        self._counts = {}
+        for table in ('analysis', 'analysis_multipv'):
+            row = self.conn.execute(f"SELECT MAX(last_used), COUNT(*) FROM {table}").fetchone()
+            self._clock = max(self._clock, row[0] or 0)
+            self._counts[table] = row[1]
+        self.conn.commit()
+
+    @staticmethod
+    def fingerprint(piece_psts):
+        """Gera uma impressão digital estável para um conjunto de tabelas PST."""
+        payload = json.dumps(piece_psts, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def position_key(board):
+        """Hash Zobrist (polyglot) da posição, convertido para inteiro com sinal de 64 bits."""
+        key = chess.polyglot.zobrist_hash(board)
+        return key - (1 << 64) if key >= (1 << 63) else key
+
+    def get(self, board, depth, fingerprint):
+        """Retorna (score, best_move) se a posição já foi analisada, ou None."""
+        position_hash = self.position_key(board)
+        row = self.conn.execute(
+            "SELECT score, best_move FROM analysis WHERE position_hash = ? AND depth = ? AND params_fingerprint = ?",
+            (position_hash, depth, fingerprint),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        score, move_uci = row
+        best_move = chess.Move.from_uci(move_uci) if move_uci else None
+        # Protege contra colisões de hash: o lance precisa ser legal na posição atual
+        if best_move is not None and best_move not in board.legal_moves:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._clock += 1
+        self.conn.execute(
+            "UPDATE analysis SET last_used = ? WHERE position_hash = ? AND depth = ? AND params_fingerprint = ?",
+            (self._clock, position_hash, depth, fingerprint),
+        )
+        return score, best_move
+
+    def put(self, board, depth, fingerprint, score, best_move):
+        """Grava o resultado de uma busca e aplica a evicção por tamanho, se necessário."""
+        self._clock += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.position_key(board), depth, fingerprint, score,
+                best_move.uci() if best_move is not None else None, self._clock,
+            ),
+        )
+        self.conn.commit()
+        self._counted_insert('analysis')
+
+    def get_multipv(self, board, depth, fingerprint, num_pv):
+        """
+        Retorna as `num_pv` melhores linhas [(score, lance, variante), ...] já calculadas para a
+        posição, ou None. Serve um pedido menor ou igual ao que foi gravado (ou a lista completa,
+        quando a posição tinha menos lances legais que o pedido gravado).
+        """
+        position_hash = self.position_key(board)
+        row = self.conn.execute(
+            "SELECT num_pv, lines FROM analysis_multipv WHERE position_hash = ? AND depth = ? AND params_fingerprint = ?",
+            (position_hash, depth, fingerprint),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        stored_num_pv, lines_json = row
+        lines = json.loads(lines_json)
+        if stored_num_pv < num_pv and len(lines) == stored_num_pv:
+            self.misses += 1
+            return None
+
+        results = []
+        for score, pv_uci in lines[:num_pv]:
+            pv = [chess.Move.from_uci(uci) for uci in pv_uci]
+            # Protege contra colisões de hash: o primeiro lance precisa ser legal na posição atual
+            if not pv or pv[0] not in board.legal_moves:
+                self.misses += 1
+                return None
+            results.append((score, pv[0], pv))
+
+        self.hits += 1
+        self._clock += 1
+        self.conn.execute(
+            "UPDATE analysis_multipv SET last_used = ? WHERE position_hash = ? AND depth = ? AND params_fingerprint = ?",
+            (self._clock, position_hash, depth, fingerprint),
+        )
+        return results
+
+    def put_multipv(self, board, depth, fingerprint, num_pv, results):
+        """Grava o resultado completo de uma busca multi-PV (scores e variantes de cada lance)."""
+        self._clock += 1
+        lines = [[score, [move.uci() for move in pv]] for score, _, pv in results]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analysis_multipv VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.position_key(board), depth, fingerprint, num_pv,
+                json.dumps(lines, separators=(',', ':')), self._clock,
+            ),
+        )
+        self.conn.commit()
+        self._counted_insert('analysis_multipv')
+
+    def _counted_insert(self, table):
+        self._counts[table] += 1
+        if self._counts[table] > self.max_entries:
+            self._evict(table)
+
+    def _evict(self, table):
+        """Remove as entradas usadas há mais tempo quando o limite de tamanho é excedido."""
+        # O contador em memória superestima (substituições contam como inserções), então confere
+        count = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            # Remove um pouco mais que o excesso para não pagar a evicção a cada inserção
+            excess += self.max_entries // 10
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE last_used <= (SELECT last_used FROM {table} ORDER BY last_used LIMIT 1 OFFSET ?)",
+                (min(excess, count) - 1,),
+            )
+            self.conn.commit()
+        self._counts[table] = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def close(self):
+        """Grava as alterações pendentes e fecha a conexão."""
+        self.conn.commit()
+        self.conn.close()
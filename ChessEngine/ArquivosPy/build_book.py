@@ -1,10 +1,9 @@
 # build_book.py
-import chess
-import chess.pgn
 import json
 from collections import defaultdict
+from pgn_index import PgnIndex
 
-def build_opening_book(pgn_file, max_games=6000, depth=20):
+def build_opening_book(pgn_file, max_games=6000, depth=20, min_elo=None):
     """
     Lê um arquivo PGN e cria um livro de aberturas baseado na frequência dos lances.
 
@@ -12,43 +11,39 @@ def build_opening_book(pgn_file, max_games=6000, depth=20):
         pgn_file (str): O caminho para o arquivo PGN.
         max_games (int): O número máximo de jogos a serem analisados.
         depth (int): O número de meio-lances (plies) a serem analisados em cada jogo.
+        min_elo (int): Se informado, usa apenas partidas em que ambos os jogadores têm pelo menos este rating.
     """
     # Usaremos um dicionário para contar os lances: {posição_fen: {lance_uci: contagem}}
     opening_counts = defaultdict(lambda: defaultdict(int))
     
     print(f"Iniciando a análise de até {max_games} jogos. Isso pode demorar...")
     
-    with open(pgn_file, "r", encoding="utf-8") as pgn:
-        game_counter = 0
-        while game_counter < max_games:
-            # Lê um jogo do arquivo PGN
-            game = chess.pgn.read_game(pgn)
-            if game is None:
-                break # Fim do arquivo
-            
-            # Imprime o progresso a cada 100 jogos
-            if game_counter % 100 == 0 and game_counter > 0:
-                print(f"Analisando jogo {game_counter}...")
+    # O índice permite ir direto às partidas (filtradas) e ler só a linha principal
+    index = PgnIndex.load(pgn_file)
+    game_ids = index.filter(min_elo=min_elo)
+
+    game_counter = 0
+    for _, headers, moves in index.iter_mainlines(game_ids, max_plies=depth, limit=max_games):
+        # Imprime o progresso a cada 100 jogos
+        if game_counter % 100 == 0 and game_counter > 0:
+            print(f"Analisando jogo {game_counter}...")
 
-            board = game.board()
+        board = headers.board()
+        
+        # Itera pelos primeiros 'depth' lances do jogo
+        for move in moves:
+            # Pega a representação da posição atual (FEN)
+            current_fen = board.fen()
+            # Pega a representação do lance (UCI)
+            move_uci = move.uci()
+            
+            # Incrementa a contagem para este lance nesta posição
+            opening_counts[current_fen][move_uci] += 1
             
-            # Itera pelos primeiros 'depth' lances do jogo
-            for i, move in enumerate(game.mainline_moves()):
-                if i >= depth:
-                    break
-                
-                # Pega a representação da posição atual (FEN)
-                current_fen = board.fen()
-                # Pega a representação do lance (UCI)
-                move_uci = move.uci()
-                
-                # Incrementa a contagem para este lance nesta posição
-                opening_counts[current_fen][move_uci] += 1
-                
-                # Executa o lance para avançar para a próxima posição
-                board.push(move)
+            # Executa o lance para avançar para a próxima posição
+            board.push(move)
 
-            game_counter += 1
+        game_counter += 1
 
     print(f"\nAnálise de {game_counter} jogos concluída. Convertendo contagens para probabilidades...")
 
@@ -1,13 +1,18 @@
 # engine.py
 import chess
+import chess.polyglot
 import json
 import random
 from constants import piece_value, piece_psts as default_parameters
+from analysis_cache import AnalysisCache
 
 class Engine:
-    def __init__(self, optimized_file=None, book_file='book.json'):
+    def __init__(self, optimized_file=None, book_file='book.json', cache=None):
         self.piece_psts = {}
+        self.params_fingerprint = None
         self.opening_book = {}
+        self.cache = cache
+        self.pv_table = None  # Tabela de variantes principais, ativa apenas durante a busca multi-PV
         self.load_parameters(optimized_file)
         self.load_opening_book(book_file)
 
@@ -16,15 +21,20 @@ class Engine:
         if optimized_file:
             try:
                 with open(optimized_file, 'r') as f:
-                    self.piece_psts = json.load(f)
+                    self.set_parameters(json.load(f))
                 print(f"Carregando parâmetros OTIMIZADOS de '{optimized_file}'...")
                 return
             except FileNotFoundError:
                 print(f"Aviso: Arquivo otimizado '{optimized_file}' não encontrado.")
         
-        self.piece_psts = default_parameters
+        self.set_parameters(default_parameters)
         print("Carregando parâmetros PADRÃO do engine...")
 
+    def set_parameters(self, piece_psts):
+        """Troca as PSTs em uso (ex.: pelo otimizador) mantendo a impressão digital do cache em dia."""
+        self.piece_psts = piece_psts
+        self.params_fingerprint = AnalysisCache.fingerprint(piece_psts)
+
     def evaluate_board(self, board):
         """Calcula a avaliação usando as tabelas carregadas na memória."""
         total_score = 0
@@ -52,6 +62,7 @@ class Engine:
             return self.evaluate_board(board), None
 
         best_move = None
+        alpha_orig, beta_orig = alpha, beta
         if is_maximizing_player:
             max_eval = -9999
             for move in board.legal_moves:
@@ -64,6 +75,7 @@ class Engine:
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break
+            self._store_pv(board, alpha_orig, beta_orig, max_eval, best_move)
             return max_eval, best_move
         else:
             min_eval = 9999
@@ -77,15 +89,88 @@ class Engine:
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break
+            self._store_pv(board, alpha_orig, beta_orig, min_eval, best_move)
             return min_eval, best_move
 
+    def _store_pv(self, board, alpha, beta, score, best_move):
+        """Guarda o melhor lance de um nó com valor exato (dentro da janela) na tabela de PV."""
+        if self.pv_table is not None and alpha < score < beta:
+            self.pv_table[chess.polyglot.zobrist_hash(board)] = best_move
+
+    def _extract_pv(self, board, max_length):
+        """Reconstrói a variante principal seguindo a tabela de PV a partir da posição atual."""
+        pv = []
+        while len(pv) < max_length:
+            move = self.pv_table.get(chess.polyglot.zobrist_hash(board))
+            if move is None or move not in board.legal_moves:
+                break
+            board.push(move)
+            pv.append(move)
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def find_best_moves(self, board, depth, num_pv=3):
+        """
+        Busca multi-PV: retorna os `num_pv` melhores lances da raiz como (score, lance, variante).
+
+        Uma única busca percorre todos os lances da raiz; cada um é buscado com a janela
+        limitada pelo N-ésimo melhor score encontrado até então, de modo que lances piores
+        são podados cedo. As variantes saem da tabela de PV preenchida durante a busca.
+        Consulta o cache persistente antes de buscar, se houver.
+        """
+        if self.cache is not None:
+            cached = self.cache.get_multipv(board, depth, self.params_fingerprint, num_pv)
+            if cached is not None:
+                return cached
+
+        maximizing = board.turn == chess.WHITE
+        results = []
+        self.pv_table = {}
+        try:
+            for move in board.legal_moves:
+                # Só interessam lances melhores que o pior dos N já encontrados
+                worst = results[-1][0] if len(results) == num_pv else None
+                if worst is None:
+                    alpha, beta = -9999, 9999
+                elif maximizing:
+                    alpha, beta = worst, 9999
+                else:
+                    alpha, beta = -9999, worst
+
+                board.push(move)
+                score, _ = self.minimax_alpha_beta(board, depth - 1, alpha, beta, not maximizing)
+                if alpha < score < beta:
+                    results.append((score, move, [move] + self._extract_pv(board, depth - 1)))
+                    results.sort(key=lambda r: r[0], reverse=maximizing)
+                    del results[num_pv:]
+                board.pop()
+        finally:
+            self.pv_table = None
+
+        if self.cache is not None and results:
+            self.cache.put_multipv(board, depth, self.params_fingerprint, num_pv, results)
+            # O melhor lance da busca multi-PV também serve às consultas de find_best_move
+            self.cache.put(board, depth, self.params_fingerprint, results[0][0], results[0][1])
+        return results
+
     def find_best_move(self, board, depth):
-        """Interface para o Minimax."""
-        _, best_move = self.minimax_alpha_beta(board, depth, -9999, 9999, board.turn == chess.WHITE)
+        """Interface para o Minimax. Consulta o cache persistente antes de buscar, se houver."""
+        if self.cache is not None:
+            cached = self.cache.get(board, depth, self.params_fingerprint)
+            if cached is not None:
+                return cached[1]
+
+        score, best_move = self.minimax_alpha_beta(board, depth, -9999, 9999, board.turn == chess.WHITE)
+        if self.cache is not None:
+            self.cache.put(board, depth, self.params_fingerprint, score, best_move)
         return best_move
 
     def load_opening_book(self, book_file='book.json'):
         """Carrega o arquivo book.json."""
+        if not book_file:
+            self.opening_book = {}
+            return
         try:
             with open(book_file, 'r') as f:
                 self.opening_book = json.load(f)
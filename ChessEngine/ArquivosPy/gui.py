@@ -12,6 +12,7 @@ WIDTH = 800
 HEIGHT = 800
 SQUARE_SIZE = WIDTH // 8
 FPS = 60
+IDLE_FPS = 5  # Taxa de quadros quando não há entrada nem lance do engine pendente
 
 # Cores
 WHITE_COLOR = (240, 217, 181)
@@ -22,6 +23,17 @@ LAST_MOVE_HIGHLIGHT_COLOR = (255, 255, 0, 100)
 # Dicionário para carregar as imagens das peças
 PIECES = {}
 
+# Mapeamento (tipo, cor) -> nome da imagem, montado uma única vez
+PIECE_SYMBOLS = {
+    (chess.PAWN, chess.WHITE): 'PW', (chess.PAWN, chess.BLACK): 'PB', (chess.ROOK, chess.WHITE): 'RDW',
+    (chess.ROOK, chess.BLACK): 'RDB', (chess.KNIGHT, chess.WHITE): 'NW', (chess.KNIGHT, chess.BLACK): 'NB',
+    (chess.BISHOP, chess.WHITE): 'BW', (chess.BISHOP, chess.BLACK): 'BB', (chess.QUEEN, chess.WHITE): 'QW',
+    (chess.QUEEN, chess.BLACK): 'QB', (chess.KING, chess.WHITE): 'KW', (chess.KING, chess.BLACK): 'KB',
+}
+
+# Superfícies pré-renderizadas (criadas em prerender_surfaces)
+SURFACES = {}
+
 def load_images():
     """Carrega as imagens das peças do diretório 'assets'."""
     assets_path = os.path.join(os.path.dirname(__file__), '..', '..', 'Assets')
@@ -36,44 +48,60 @@ def load_images():
             print(f"Erro ao carregar a imagem {image_path}: {e}")
             raise SystemExit()
 
-def draw_game_state(screen, board, selected_square, last_move):
-    """Função principal de desenho que desenha o tabuleiro e as peças."""
+def prerender_surfaces():
+    """Pré-renderiza o fundo do tabuleiro e as superfícies de destaque, reutilizadas a cada quadro."""
+    background = pygame.Surface((WIDTH, HEIGHT))
     for row in range(8):
         for col in range(8):
             color = WHITE_COLOR if (row + col) % 2 == 0 else BLACK_COLOR
-            pygame.draw.rect(screen, color, pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+            pygame.draw.rect(background, color, square_rect(chess.square(col, 7 - row)))
+    SURFACES['background'] = background.convert()
 
-    if last_move:
-        start_square = last_move.from_square
-        end_square = last_move.to_square
-        start_row, start_col = 7 - chess.square_rank(start_square), chess.square_file(start_square)
-        end_row, end_col = 7 - chess.square_rank(end_square), chess.square_file(end_square)
-        
+    for name, color in (('selected', HIGHLIGHT_COLOR), ('last_move', LAST_MOVE_HIGHLIGHT_COLOR)):
         s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        s.fill(LAST_MOVE_HIGHLIGHT_COLOR)
-        screen.blit(s, (start_col * SQUARE_SIZE, start_row * SQUARE_SIZE))
-        screen.blit(s, (end_col * SQUARE_SIZE, end_row * SQUARE_SIZE))
-
+        s.fill(color)
+        SURFACES[name] = s.convert_alpha()
+
+def square_rect(square):
+    """Retângulo da tela ocupado por uma casa do tabuleiro."""
+    row, col = 7 - chess.square_rank(square), chess.square_file(square)
+    return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+def draw_squares(screen, board, squares, selected_square, last_move):
+    """Redesenha apenas as casas indicadas e retorna os retângulos alterados."""
+    highlighted = {last_move.from_square, last_move.to_square} if last_move else set()
+    rects = []
+    for square in squares:
+        rect = square_rect(square)
+        screen.blit(SURFACES['background'], rect, rect)
+        if square in highlighted:
+            screen.blit(SURFACES['last_move'], rect)
+        if square == selected_square:
+            screen.blit(SURFACES['selected'], rect)
+        piece = board.piece_at(square)
+        if piece is not None:
+            screen.blit(PIECES[PIECE_SYMBOLS[(piece.piece_type, piece.color)]], rect)
+        rects.append(rect)
+    return rects
 
-    if selected_square is not None:
-        row, col = 7 - chess.square_rank(selected_square), chess.square_file(selected_square)
-        s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        s.fill(HIGHLIGHT_COLOR)
-        screen.blit(s, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-
-    piece_map = {
-        (chess.PAWN, chess.WHITE): 'PW', (chess.PAWN, chess.BLACK): 'PB', (chess.ROOK, chess.WHITE): 'RDW',
-        (chess.ROOK, chess.BLACK): 'RDB', (chess.KNIGHT, chess.WHITE): 'NW', (chess.KNIGHT, chess.BLACK): 'NB',
-        (chess.BISHOP, chess.WHITE): 'BW', (chess.BISHOP, chess.BLACK): 'BB', (chess.QUEEN, chess.WHITE): 'QW',
-        (chess.QUEEN, chess.BLACK): 'QB', (chess.KING, chess.WHITE): 'KW', (chess.KING, chess.BLACK): 'KB',
+def draw_game_state(screen, board, selected_square, last_move):
+    """Função principal de desenho que desenha o tabuleiro e as peças por completo."""
+    draw_squares(screen, board, chess.SQUARES, selected_square, last_move)
+
+def dirty_squares(board, previous_pieces, selected_square, previous_selected, last_move, previous_last_move):
+    """Calcula as casas que mudaram desde o último quadro desenhado."""
+    current_pieces = board.piece_map()
+    squares = {
+        square for square in current_pieces.keys() | previous_pieces.keys()
+        if current_pieces.get(square) != previous_pieces.get(square)
     }
-    for square_index in chess.SQUARES:
-        piece = board.piece_at(square_index)
-        if piece is not None:
-            symbol = piece_map[(piece.piece_type, piece.color)]
-            row = 7 - chess.square_rank(square_index)
-            col = chess.square_file(square_index)
-            screen.blit(PIECES[symbol], pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    if last_move != previous_last_move:
+        for move in (last_move, previous_last_move):
+            if move is not None:
+                squares.update((move.from_square, move.to_square))
+    if selected_square != previous_selected:
+        squares.update(sq for sq in (selected_square, previous_selected) if sq is not None)
+    return squares, current_pieces
 
 def draw_game_over(screen, result):
     font = pygame.font.SysFont("Arial", 50)
@@ -108,7 +136,8 @@ def start_screen(screen):
     search_depth = None
 
     while player_color is None or search_depth is None:
-        for event in pygame.event.get():
+        # Bloqueia até o próximo evento em vez de girar o loop sem descanso
+        for event in [pygame.event.wait()] + pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 raise SystemExit()
@@ -131,6 +160,7 @@ def main():
     clock = pygame.time.Clock()
     
     load_images()
+    prerender_surfaces()
     
     engine = Engine(optimized_file="optimized_constants_opening.json")
 
@@ -143,14 +173,24 @@ def main():
     last_move = None
     game_over = False
 
+    # Estado do último quadro desenhado, usado para redesenhar só o que mudou
+    full_redraw = True
+    previous_pieces = {}
+    previous_selected = None
+    previous_last_move = None
+
     running = True
     while running:
         is_human_turn = (board.turn == player_turn)
 
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
 
+            if event.type == pygame.VIDEOEXPOSE:
+                full_redraw = True
+
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_s and not game_over:
                     game = chess.pgn.Game()
@@ -200,6 +240,7 @@ def main():
                 board.reset()
                 last_move = None
                 game_over = False
+                full_redraw = True
 
 
         if not board.is_game_over() and not is_human_turn and not game_over:
@@ -208,19 +249,35 @@ def main():
             board.push(engine_move)
             last_move = engine_move
 
-        draw_game_state(screen, board, selected_square, last_move)
+        if full_redraw:
+            draw_game_state(screen, board, selected_square, last_move)
+            previous_pieces = board.piece_map()
+            dirty_rects = [screen.get_rect()]
+        else:
+            squares, previous_pieces = dirty_squares(
+                board, previous_pieces, selected_square, previous_selected, last_move, previous_last_move
+            )
+            dirty_rects = draw_squares(screen, board, squares, selected_square, last_move)
+        previous_selected = selected_square
+        previous_last_move = last_move
         
         if board.is_game_over() and not game_over:
             game_over = True
+            full_redraw = True
             print("\nFIM DE JOGO!")
             print("Resultado: " + board.result())
 
-        if game_over:
+        if game_over and full_redraw:
             draw_game_over(screen, board.result())
+            dirty_rects = [screen.get_rect()]
 
-        pygame.display.flip()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        full_redraw = False
         
-        clock.tick(FPS)
+        # Sem entrada do jogador nem lance do engine pendente, não há o que animar: economiza CPU
+        engine_pending = not game_over and board.turn != player_turn
+        clock.tick(FPS if events or engine_pending else IDLE_FPS)
             
     pygame.quit()
 
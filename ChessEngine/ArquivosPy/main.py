@@ -1,11 +1,15 @@
 import chess
 import chess.pgn
+import json
 from engine import Engine
+from analysis_cache import AnalysisCache
 from visualizer import get_advantage_bar, plot_evaluation
 
-def analisar_partida(pgn_file, search_depth):
-    engine = Engine()
+def analisar_partida(pgn_file, search_depth, cache_file='analysis_cache.db', num_pv=3, json_file='analise.json'):
+    cache = AnalysisCache(cache_file) if cache_file else None
+    engine = Engine(cache=cache)
     eval_history = [0.0]
+    analysis = []
     with open(pgn_file) as pgn:
         try:
             game = chess.pgn.read_game(pgn)
@@ -27,23 +31,44 @@ def analisar_partida(pgn_file, search_depth):
         else:
             print(f"Jogada {move_number -1}. ... Pretas:")
         
-        print(f"Lance jogado: {board.san(move)}")
+        move_san = board.san(move)
+        print(f"Lance jogado: {move_san}")
         board.push(move)
         
         score = engine.evaluate_board(board)
         eval_history.append(score)
         bar = get_advantage_bar(score)
         print(f"Avaliação do engine: {score:.2f} {bar}")
+        ply_analysis = {"ply": len(board.move_stack), "move": move_san, "evaluation": score, "alternatives": []}
+        analysis.append(ply_analysis)
 
         if board.is_game_over():
             print("\nFIM DE JOGO!")
             break
         
         print("Engine pensando...")
-        engine_move = engine.find_best_move(board, search_depth)
-        print(f"Engine recomendaria: {board.san(engine_move)}")
+        alternatives = engine.find_best_moves(board, search_depth, num_pv)
+        print(f"Engine recomendaria: {board.san(alternatives[0][1])}")
+        for rank, (pv_score, pv_move, pv) in enumerate(alternatives, start=1):
+            if num_pv > 1:
+                print(f"  {rank}. {pv_score:+.2f}  {board.variation_san(pv)}")
+            ply_analysis["alternatives"].append({
+                "move": board.san(pv_move),
+                "score": pv_score,
+                "pv": [m.uci() for m in pv],
+                "pv_san": board.variation_san(pv),
+            })
         print("-----------------------------------")
     
+    if cache is not None:
+        print(f"\nCache de análise: {cache.hits} acertos, {cache.misses} falhas.")
+        cache.close()
+
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump({"pgn_file": pgn_file, "depth": search_depth, "num_pv": num_pv, "moves": analysis}, f, indent=2, ensure_ascii=False)
+        print(f"Análise salva em '{json_file}'")
+
     plot_evaluation(eval_history)
 
 if __name__ == "__main__":
@@ -1,62 +1,153 @@
 # optimizer.py
 import chess
-import chess.pgn
 import random
 import copy
 import json
+import math
 
 # Importa as funções e constantes dos nossos outros módulos
-from engine import find_best_move
+from engine import Engine
 from constants import piece_psts as initial_parameters
+from pgn_index import PgnIndex
 
-def get_test_positions(pgn_file, num_games_to_check=50, max_plies_per_game=40):
+# Engine usado só para busca: sem livro de aberturas, com as PSTs trocadas a cada avaliação
+_search_engine = None
+
+def find_best_move(board, depth, params):
+    """Busca o melhor lance usando um conjunto arbitrário de PSTs."""
+    global _search_engine
+    if _search_engine is None:
+        _search_engine = Engine(book_file=None)
+    _search_engine.set_parameters(params)
+    return _search_engine.find_best_move(board, depth)
+
+def get_test_positions(pgn_file, num_games_to_check=50, max_plies_per_game=40, random_sample=False, min_elo=None):
     """
     Lê um PGN e extrai TODAS as posições e lances até uma certa profundidade (plies)
     para criar um dataset focado em aberturas.
+    Usa o índice do PGN para ir direto às partidas escolhidas (as primeiras ou, com
+    random_sample, um sorteio), opcionalmente filtradas por rating mínimo.
     """
     positions = []
     print(f"Carregando posições de abertura de até {num_games_to_check} jogos (profundidade máx: {max_plies_per_game} meio-lances)...")
     
-    with open(pgn_file, "r", encoding="utf-8") as pgn:
-        game_count = 0
-        while game_count < num_games_to_check:
-            try:
-                game = chess.pgn.read_game(pgn)
-                if game is None:
-                    break
-                
-                board = game.board()
-                # Itera pelos lances do jogo, até o limite definido
-                for i, move in enumerate(game.mainline_moves()):
-                    if i >= max_plies_per_game:
-                        break
-                    
-                    # Adiciona a posição ATUAL e o lance que foi JOGADO NELA
-                    positions.append((board.copy(), move))
-                    # Executa o lance para avançar para a próxima posição
-                    board.push(move)
-                
-                game_count += 1
-            except (ValueError, IndexError):
-                continue # Ignora jogos malformados
+    index = PgnIndex.load(pgn_file)
+    game_ids = index.filter(min_elo=min_elo)
+    if random_sample:
+        # Embaralha todas as candidatas; o limite abaixo pega as primeiras válidas
+        game_ids = index.sample(len(game_ids), game_ids)
+
+    for _, headers, moves in index.iter_mainlines(game_ids, max_plies=max_plies_per_game, limit=num_games_to_check):
+        board = headers.board()
+        for move in moves:
+            # Adiciona a posição ATUAL e o lance que foi JOGADO NELA
+            positions.append((board.copy(), move))
+            # Executa o lance para avançar para a próxima posição
+            board.push(move)
                 
     print(f"{len(positions)} posições de abertura carregadas com sucesso.")
     return positions
 
-def calculate_fitness(depth, test_positions, current_params):
-    """Calcula a "nota de fitness" do engine com os parâmetros atuais."""
-    matches = 0
-    # Para o teste não ser tão demorado, usamos uma amostra aleatória do nosso grande dataset de aberturas
-    sample_size = min(len(test_positions), 100) # Testa em, no máximo, 100 posições por iteração
-    sample_positions = random.sample(test_positions, k=sample_size)
-    
-    for i, (board, master_move) in enumerate(sample_positions):
-        engine_move = find_best_move(board, depth, current_params)
-        if engine_move == master_move:
-            matches += 1
-            
-    fitness_score = (matches / sample_size) * 100
-    return fitness_score
+class RacingEvaluator:
+    """
+    Avaliação com parada antecipada ("racing") de uma mutação contra os parâmetros atuais.
+
+    Baseline e candidato são avaliados na MESMA sequência de posições. Só as posições em
+    que os dois discordam (um acerta o lance do mestre e o outro não) carregam informação,
+    então a decisão é um teste sequencial (SPRT) sobre essas discordâncias: H0 "o candidato
+    vence metade delas" contra H1 "vence uma fração `p_better`". A corrida também termina
+    quando, mesmo projetando as discordâncias restantes com folga, já não haveria evidência
+    suficiente para aceitar. Os resultados do baseline ficam em cache por posição e nunca
+    são recalculados.
+    """
+
+    def __init__(self, depth, test_positions, baseline_params, max_positions=100, min_positions=20,
+                 p_better=0.75, alpha=0.05, beta=0.10, confidence_z=2.0):
+        self.depth = depth
+        self.test_positions = test_positions
+        self.baseline_params = baseline_params
+        self.max_positions = min(max_positions, len(test_positions))
+        self.min_positions = min_positions
+        self.confidence_z = confidence_z
+        # Incrementos do log da razão de verossimilhança por vitória/derrota do candidato
+        self.llr_win = math.log(p_better / 0.5)
+        self.llr_loss = math.log((1 - p_better) / 0.5)
+        self.llr_accept = math.log((1 - beta) / alpha)
+        self.llr_reject = math.log(beta / (1 - alpha))
+        self.baseline_results = {} # índice da posição -> 1 se o baseline acertou o lance do mestre
+        self.reference_positions = []
+        self.decisions = 0
+        self.positions_evaluated = 0
+
+    def _matches(self, params, index):
+        board, master_move = self.test_positions[index]
+        return 1 if find_best_move(board, self.depth, params) == master_move else 0
+
+    def _baseline_matches(self, index):
+        if index not in self.baseline_results:
+            self.baseline_results[index] = self._matches(self.baseline_params, index)
+        return self.baseline_results[index]
+
+    def warm_up(self):
+        """Sorteia o conjunto fixo de posições de referência e retorna a nota do baseline nele."""
+        self.reference_positions = random.sample(range(len(self.test_positions)), k=self.max_positions)
+        return self.baseline_fitness()
+
+    def baseline_fitness(self):
+        """Porcentagem de acertos do baseline no conjunto fixo de referência (comparável entre chamadas)."""
+        matches = sum(self._baseline_matches(index) for index in self.reference_positions)
+        return matches / len(self.reference_positions) * 100
+
+    def race(self, candidate_params):
+        """
+        Compara o candidato com o baseline.
+        Retorna (aceito, saldo de acertos, posições avaliadas, resultados do candidato).
+        """
+        order = random.sample(range(len(self.test_positions)), k=self.max_positions)
+        candidate_results = {}
+        wins = 0
+        losses = 0
+        llr = 0.0
+        accepted = False
+
+        for n, index in enumerate(order, start=1):
+            candidate_results[index] = self._matches(candidate_params, index)
+            diff = candidate_results[index] - self._baseline_matches(index)
+            if diff > 0:
+                wins += 1
+                llr += self.llr_win
+            elif diff < 0:
+                losses += 1
+                llr += self.llr_loss
+
+            if llr >= self.llr_accept:
+                accepted = True
+                break
+            if llr <= self.llr_reject:
+                break
+
+            if n >= self.min_positions:
+                # Projeção otimista: discordâncias restantes pela taxa observada (suavizada) mais
+                # uma margem que cresce com sqrt(restantes), todas contadas como vitórias
+                remaining = self.max_positions - n
+                rate = (wins + losses + 1) / (n + 2)
+                future = remaining * rate + self.confidence_z * math.sqrt(remaining * rate * (1 - rate))
+                if llr + future * self.llr_win < self.llr_accept:
+                    break
+
+        # Sem atingir o limite de aceitação, a mutação não demonstrou ser melhor
+        self.decisions += 1
+        self.positions_evaluated += n
+        return accepted, wins - losses, n, candidate_results
+
+    def accept(self, candidate_params, candidate_results):
+        """Promove o candidato a baseline, reaproveitando os resultados já calculados para ele."""
+        self.baseline_params = candidate_params
+        self.baseline_results = dict(candidate_results)
+
+    @property
+    def average_positions_per_decision(self):
+        return self.positions_evaluated / self.decisions if self.decisions else 0.0
 
 def mutate_parameters(params):
     """Faz uma pequena mutação aleatória em um dos valores das tabelas PST."""
@@ -88,34 +179,45 @@ if __name__ == "__main__":
     
     # Parâmetros e nota iniciais
     current_params = initial_parameters
+    # Avaliador com parada antecipada: descarta mutações ruins sem rodar as 100 posições
+    evaluator = RacingEvaluator(search_depth_for_test, test_positions, current_params)
     print("\nCalculando a nota de fitness inicial do engine...")
-    best_fitness = calculate_fitness(search_depth_for_test, test_positions, current_params)
-    print(f"Nota de Fitness Inicial (Aberturas): {best_fitness:.2f}%")
+    initial_fitness = evaluator.warm_up()
+    print(f"Nota de Fitness Inicial (Aberturas): {initial_fitness:.2f}%")
+    accepted_mutations = 0
+    total_balance = 0
 
     # Loop de otimização
     for i in range(optimization_iterations):
         print("\n" + "="*40)
-        print(f"|  Iteração de Otimização {i+1}/{optimization_iterations} | Melhor Nota Atual: {best_fitness:.2f}%  |")
+        print(f"|  Iteração de Otimização {i+1}/{optimization_iterations} | Mutações aceitas: {accepted_mutations}  |")
         print("="*40)
         
         mutated_params = mutate_parameters(current_params)
         
         print("Testando a nova versão (isso pode levar alguns minutos)...")
-        new_fitness = calculate_fitness(search_depth_for_test, test_positions, mutated_params)
-        print(f"Nota da nova versão: {new_fitness:.2f}%")
+        accepted, diff, evaluated, candidate_results = evaluator.race(mutated_params)
+        print(f"Saldo da nova versão contra a atual: {diff:+d} acertos em {evaluated} posições")
         
-        if new_fitness > best_fitness:
-            print(f"🎉 MELHORA ENCONTRADA! Nota aumentou de {best_fitness:.2f}% para {new_fitness:.2f}%. 🎉")
+        if accepted:
+            evaluator.accept(mutated_params, candidate_results)
             current_params = mutated_params
-            best_fitness = new_fitness
+            accepted_mutations += 1
+            total_balance += diff
+            print(f"🎉 MELHORA ENCONTRADA! Saldo de {diff:+d} acertos nas mesmas posições. 🎉")
         else:
             print("Nenhuma melhora. Descartando a mutação.")
+        print(f"Média de posições avaliadas por decisão: {evaluator.average_positions_per_decision:.1f}")
     
     print("\n" + "="*40)
     print("Otimização Finalizada!")
-    print(f"A melhor nota de fitness alcançada foi: {best_fitness:.2f}%")
+    print(f"Mutações aceitas: {accepted_mutations} (saldo acumulado: {total_balance:+d} acertos)")
+    # Mesmo conjunto de referência da nota inicial, para que as duas sejam comparáveis
+    final_fitness = evaluator.baseline_fitness()
+    print(f"Nota de fitness no conjunto de referência: {initial_fitness:.2f}% -> {final_fitness:.2f}%")
+    print(f"Média de posições avaliadas por decisão: {evaluator.average_positions_per_decision:.1f} (máximo {evaluator.max_positions})")
     
     # Salva os melhores parâmetros encontrados em um novo arquivo
     with open('optimized_constants_opening.json', 'w') as f:
         json.dump(current_params, f, indent=2)
-    print("Os melhores parâmetros de ABERTURA foram salvos em 'optimized_constants_opening.json'")
\ No newline at end of file
+    print("Os melhores parâmetros de ABERTURA foram salvos em 'optimized_constants_opening.json'")
@@ -0,0 +1,248 @@
+# pgn_index.py
+import gzip
+import io
+import json
+import os
+import random
+import re
+import chess
+import chess.pgn
+
+# Cabeçalhos guardados no índice para permitir filtros sem reler o PGN
+INDEXED_HEADERS = ['White', 'Black', 'WhiteElo', 'BlackElo', 'ECO', 'Result', 'Date', 'Event']
+
+HEADER_REGEX = re.compile(rb'^\[([A-Za-z0-9_]+)\s+"(.*)"\]')
+
+def _inside_comment_after(line, in_comment):
+    """
+    Atualiza o estado "dentro de um comentário {...}" ao fim de uma linha de lances.
+    Comentários de linha (`;`) vão até o fim da linha e não abrem chaves.
+    """
+    pos = 0
+    while True:
+        if in_comment:
+            end = line.find(b'}', pos)
+            if end < 0:
+                return True
+            in_comment = False
+            pos = end + 1
+        else:
+            brace = line.find(b'{', pos)
+            semicolon = line.find(b';', pos)
+            if brace < 0 or 0 <= semicolon < brace:
+                return False
+            in_comment = True
+            pos = brace + 1
+
+class MainlineVisitor(chess.pgn.BaseVisitor):
+    """
+    Visitor leve para `chess.pgn.read_game`: guarda só os cabeçalhos e os lances da linha
+    principal, sem montar a árvore de nós. Variantes são puladas e, com `max_plies`, os
+    lances além do limite nem chegam a ser interpretados.
+    """
+
+    def __init__(self, max_plies=None):
+        self.max_plies = max_plies
+
+    def begin_game(self):
+        self.headers = chess.pgn.Headers()
+        self.moves = []
+        self.error = None
+        self.tag_count = 0
+
+    def begin_headers(self):
+        return self.headers
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+        self.tag_count += 1
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def begin_parse_san(self, board, san):
+        if self.max_plies is not None and len(self.moves) >= self.max_plies:
+            return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        self.moves.append(move)
+
+    def handle_error(self, error):
+        self.error = error
+
+    def result(self):
+        return self.headers, self.moves, self.error, self.tag_count
+
+class PgnIndex:
+    """
+    Índice de um arquivo PGN: offset em bytes e cabeçalhos selecionados de cada partida.
+
+    Construído uma única vez (varredura em modo binário, sem interpretar os lances) e salvo
+    em um JSON compactado com gzip ao lado do PGN. Com ele, as ferramentas vão direto às
+    partidas sorteadas ou filtradas e interpretam apenas essas.
+    """
+
+    def __init__(self, pgn_file, offsets, headers, pgn_size):
+        self.pgn_file = pgn_file
+        self.offsets = offsets
+        self.headers = headers  # Uma lista por partida, na ordem de INDEXED_HEADERS
+        self.pgn_size = pgn_size
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def default_index_file(pgn_file):
+        return pgn_file + '.idx.json.gz'
+
+    @classmethod
+    def build(cls, pgn_file, index_file=None):
+        """Varre o PGN registrando onde começa cada partida e seus cabeçalhos."""
+        print(f"Indexando '{pgn_file}'...")
+        offsets = []
+        headers = []
+        field_positions = {name: i for i, name in enumerate(INDEXED_HEADERS)}
+        in_headers = False
+        in_comment = False
+        offset = 0
+
+        with open(pgn_file, 'rb') as pgn:
+            for line in pgn:
+                if offset == 0 and line.startswith(b'\xef\xbb\xbf'):
+                    line = line[3:]
+                    offset = 3
+                line_start = offset
+                offset += len(line)
+
+                # Linhas como "[%clk 0:03:00]}" dentro de um comentário quebrado não são cabeçalhos
+                tag_match = None if in_comment else HEADER_REGEX.match(line)
+                if tag_match:
+                    # Um bloco de cabeçalhos depois de lances (ou no início) abre uma nova partida
+                    if not in_headers:
+                        in_headers = True
+                        offsets.append(line_start)
+                        headers.append([''] * len(INDEXED_HEADERS))
+                    name = tag_match.group(1).decode('utf-8', 'replace')
+                    if name in field_positions:
+                        headers[-1][field_positions[name]] = tag_match.group(2).decode('utf-8', 'replace')
+                elif in_headers and not in_comment and line.startswith(b'['):
+                    continue # Cabeçalho malformado: o read_game também o ignora
+                elif in_comment or line.strip():
+                    in_headers = False
+                    # Linhas de escape (% no início, fora de comentário) são ignoradas pelo PGN
+                    if in_comment or not line.startswith(b'%'):
+                        in_comment = _inside_comment_after(line, in_comment)
+
+        index = cls(pgn_file, offsets, headers, os.path.getsize(pgn_file))
+        index.save(index_file or cls.default_index_file(pgn_file))
+        print(f"{len(index)} partidas indexadas.")
+        return index
+
+    def save(self, index_file):
+        data = {
+            'pgn_size': self.pgn_size,
+            'pgn_mtime': os.path.getmtime(self.pgn_file),
+            'fields': INDEXED_HEADERS,
+            'offsets': self.offsets,
+            'headers': self.headers,
+        }
+        with gzip.open(index_file, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, pgn_file, index_file=None):
+        """Carrega o índice do PGN, reconstruindo-o se não existir ou se o PGN mudou."""
+        index_file = index_file or cls.default_index_file(pgn_file)
+        try:
+            with gzip.open(index_file, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls.build(pgn_file, index_file)
+
+        stale = (
+            data['pgn_size'] != os.path.getsize(pgn_file)
+            or data['pgn_mtime'] != os.path.getmtime(pgn_file)
+            or data['fields'] != INDEXED_HEADERS
+        )
+        if stale:
+            print(f"Aviso: índice '{index_file}' desatualizado. Reconstruindo...")
+            return cls.build(pgn_file, index_file)
+        return cls(pgn_file, data['offsets'], data['headers'], data['pgn_size'])
+
+    def header(self, game_id, name):
+        return self.headers[game_id][INDEXED_HEADERS.index(name)]
+
+    def filter(self, player=None, min_elo=None, eco=None, result=None):
+        """
+        Retorna os ids das partidas que atendem aos filtros.
+
+        player: trecho do nome das Brancas ou das Pretas (sem diferenciar maiúsculas).
+        min_elo: rating mínimo exigido de AMBOS os jogadores.
+        eco: prefixo do código ECO (ex.: 'B9' casa com B90-B99).
+        result: '1-0', '0-1' ou '1/2-1/2'.
+        """
+        white, black, white_elo, black_elo, eco_i, result_i = (
+            INDEXED_HEADERS.index(name) for name in ('White', 'Black', 'WhiteElo', 'BlackElo', 'ECO', 'Result')
+        )
+        player = player.lower() if player else None
+        game_ids = []
+        for game_id, values in enumerate(self.headers):
+            if player and player not in values[white].lower() and player not in values[black].lower():
+                continue
+            if min_elo is not None:
+                elos = (values[white_elo], values[black_elo])
+                if not all(elo.isdigit() and int(elo) >= min_elo for elo in elos):
+                    continue
+            if eco and not values[eco_i].startswith(eco):
+                continue
+            if result and values[result_i] != result:
+                continue
+            game_ids.append(game_id)
+        return game_ids
+
+    def sample(self, k, game_ids=None, seed=None):
+        """Sorteia até k partidas (opcionalmente dentre `game_ids`)."""
+        population = range(len(self)) if game_ids is None else game_ids
+        return random.Random(seed).sample(population, k=min(k, len(population)))
+
+    def _game_bytes(self, pgn, game_id):
+        end = self.offsets[game_id + 1] if game_id + 1 < len(self.offsets) else self.pgn_size
+        pgn.seek(self.offsets[game_id])
+        return pgn.read(end - self.offsets[game_id])
+
+    def iter_mainlines(self, game_ids, max_plies=None, limit=None):
+        """
+        Gera (id, cabeçalhos, lances da linha principal) de cada partida pedida, indo direto
+        ao offset de cada uma. Como no `read_game` original, uma partida com lance inválido
+        rende os lances legais anteriores ao erro; trechos sem cabeçalhos nem lances são pulados.
+        Com `limit`, para depois de gerar esse número de partidas (contando só as válidas).
+        """
+        if limit is not None and limit <= 0:
+            return
+        yielded = 0
+        with open(self.pgn_file, 'rb') as pgn:
+            for game_id in game_ids:
+                text = self._game_bytes(pgn, game_id).decode('utf-8', 'replace')
+                game = chess.pgn.read_game(io.StringIO(text), Visitor=lambda: MainlineVisitor(max_plies))
+                if game is None:
+                    continue
+                headers, moves, _, tag_count = game
+                # Trecho sem cabeçalhos nem lances não é uma partida: não gera nem conta no limite
+                if not tag_count and not moves:
+                    continue
+                yield game_id, headers, moves
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+
+    def read_mainline(self, game_id, max_plies=None):
+        """Lê uma única partida: retorna (cabeçalhos, lances) ou None se não houver partida no trecho."""
+        for _, headers, moves in self.iter_mainlines([game_id], max_plies):
+            return headers, moves
+        return None
+
+if __name__ == "__main__":
+    try:
+        PgnIndex.build('magnus_games.pgn')
+    except FileNotFoundError:
+        print("Erro: Arquivo 'magnus_games.pgn' não encontrado.")
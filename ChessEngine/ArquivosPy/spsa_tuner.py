@@ -0,0 +1,178 @@
+# spsa_tuner.py
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import numpy as np
+
+from engine import Engine
+from constants import piece_psts as initial_parameters
+from optimizer import get_test_positions
+
+# Ordem fixa das peças ao achatar as PSTs em um único vetor de 384 parâmetros
+PIECE_ORDER = ['p', 'n', 'b', 'r', 'q', 'k']
+
+# Estado de cada processo de avaliação (criado em _init_worker)
+_worker_positions = None
+_worker_engine = None
+
+def params_to_vector(params):
+    """Achata o dicionário de PSTs em um vetor NumPy."""
+    return np.array([params[piece][square] for piece in PIECE_ORDER for square in range(64)], dtype=float)
+
+def vector_to_params(theta, round_values=False):
+    """Reconstrói o dicionário de PSTs (formato do optimized_constants_opening.json) a partir do vetor."""
+    values = np.rint(theta).astype(int).tolist() if round_values else theta.tolist()
+    return {piece: values[i * 64:(i + 1) * 64] for i, piece in enumerate(PIECE_ORDER)}
+
+def _init_worker(positions):
+    """Recebe as posições uma única vez por processo; as tarefas passam apenas índices."""
+    global _worker_positions, _worker_engine
+    _worker_positions = [(chess.Board(fen), chess.Move.from_uci(uci)) for fen, uci in positions]
+    _worker_engine = Engine(book_file=None)
+
+def _count_matches(theta, indices, depth):
+    """Conta em quantas posições da amostra o engine com `theta` joga o lance do mestre."""
+    _worker_engine.set_parameters(vector_to_params(theta))
+    matches = 0
+    for i in indices:
+        board, master_move = _worker_positions[i]
+        if _worker_engine.find_best_move(board, depth) == master_move:
+            matches += 1
+    return matches
+
+def positions_fingerprint(positions):
+    """Impressão digital do conjunto de posições (FEN, lance), para validar checkpoints."""
+    payload = json.dumps(positions, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def save_checkpoint(checkpoint_file, settings, theta, iteration, rng, history):
+    """Grava o estado do tuner de forma atômica para que execuções longas possam ser retomadas."""
+    state = {
+        'settings': settings,
+        'iteration': iteration,
+        'theta': theta.tolist(),
+        'rng_state': rng.bit_generator.state,
+        'history': history,
+    }
+    tmp_file = checkpoint_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, checkpoint_file)
+
+def load_checkpoint(checkpoint_file, settings, rng):
+    """
+    Restaura (theta, iteração, histórico) de um checkpoint, ou None se não existir.
+    Recusa checkpoints gravados com outra configuração ou outro conjunto de posições.
+    O número de iterações pode mudar (para estender uma execução), com aviso.
+    """
+    try:
+        with open(checkpoint_file, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    saved_settings = state.get('settings', {})
+    mismatched = [
+        key for key in settings
+        if key != 'iterations' and saved_settings.get(key) != settings[key]
+    ]
+    if mismatched:
+        raise ValueError(
+            f"O checkpoint '{checkpoint_file}' foi gravado com outra configuração ({', '.join(mismatched)}). "
+            "Apague-o ou use outro checkpoint_file."
+        )
+    if saved_settings.get('iterations') != settings['iterations']:
+        print(f"Aviso: checkpoint gravado para {saved_settings.get('iterations')} iterações; continuando até {settings['iterations']}.")
+
+    rng.bit_generator.state = state['rng_state']
+    print(f"Retomando do checkpoint '{checkpoint_file}' (iteração {state['iteration']}).")
+    return np.array(state['theta'], dtype=float), state['iteration'], state['history']
+
+def spsa_tune(test_positions, depth=3, iterations=200, sample_size=100, workers=None,
+              a=2000.0, c=5.0, big_a=20.0, alpha=0.602, gamma=0.101,
+              checkpoint_file='spsa_checkpoint.json', checkpoint_every=5, seed=0):
+    """
+    Otimiza todas as PSTs ao mesmo tempo com SPSA (Simultaneous Perturbation Stochastic Approximation).
+
+    A cada iteração todos os 384 parâmetros são perturbados em ±c_k, e os candidatos
+    theta + c_k*delta e theta - c_k*delta são avaliados em paralelo na MESMA amostra de
+    posições. A diferença entre as duas notas estima o gradiente de todos os parâmetros.
+    """
+    positions = [(board.fen(), move.uci()) for board, move in test_positions]
+    sample_size = min(sample_size, len(positions))
+    settings = {
+        'iterations': iterations, 'sample_size': sample_size, 'seed': seed, 'depth': depth,
+        'a': a, 'c': c, 'big_a': big_a, 'alpha': alpha, 'gamma': gamma,
+        'positions': positions_fingerprint(positions),
+    }
+
+    rng = np.random.default_rng(seed)
+    theta = params_to_vector(initial_parameters)
+    start_iteration = 0
+    history = []
+
+    restored = load_checkpoint(checkpoint_file, settings, rng) if checkpoint_file else None
+    if restored is not None:
+        theta, start_iteration, history = restored
+        if start_iteration >= iterations:
+            print(f"Aviso: o checkpoint '{checkpoint_file}' já concluiu {start_iteration} iterações; nada a fazer. "
+                  "Aumente `iterations` para continuar ou apague o checkpoint para recomeçar.")
+            return vector_to_params(theta, round_values=True)
+
+    workers = workers or os.cpu_count()
+    # Cada candidato é dividido em blocos para ocupar todos os processos
+    chunks_per_candidate = max(1, workers // 2)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(positions,)) as pool:
+        for k in range(start_iteration, iterations):
+            a_k = a / (k + 1 + big_a) ** alpha
+            c_k = c / (k + 1) ** gamma
+            delta = rng.choice([-1.0, 1.0], size=theta.shape)
+            sample = rng.choice(len(positions), size=sample_size, replace=False)
+            chunks = np.array_split(sample, chunks_per_candidate)
+
+            theta_plus = theta + c_k * delta
+            theta_minus = theta - c_k * delta
+            futures_plus = [pool.submit(_count_matches, theta_plus, chunk, depth) for chunk in chunks]
+            futures_minus = [pool.submit(_count_matches, theta_minus, chunk, depth) for chunk in chunks]
+            fitness_plus = sum(f.result() for f in futures_plus) / sample_size * 100
+            fitness_minus = sum(f.result() for f in futures_minus) / sample_size * 100
+
+            # Para delta = ±1, 1/delta == delta
+            gradient = (fitness_plus - fitness_minus) / (2 * c_k) * delta
+            theta = theta + a_k * gradient / 100
+
+            history.append({'iteration': k + 1, 'fitness_plus': fitness_plus, 'fitness_minus': fitness_minus})
+            print(f"Iteração {k + 1}/{iterations} | +: {fitness_plus:.2f}% | -: {fitness_minus:.2f}% | passo a_k={a_k:.2f} c_k={c_k:.2f}")
+
+            if checkpoint_file and ((k + 1) % checkpoint_every == 0 or k + 1 == iterations):
+                save_checkpoint(checkpoint_file, settings, theta, k + 1, rng, history)
+
+    return vector_to_params(theta, round_values=True)
+
+if __name__ == "__main__":
+
+    # Parâmetros do Treinamento
+    optimization_iterations = 200 # Iterações SPSA (cada uma avalia 2 candidatos)
+    num_games_for_dataset = 100   # Quantos jogos usar para criar nosso dataset de aberturas
+    search_depth_for_test = 3     # Profundidade do engine durante o teste
+    opening_depth = 40            # Os primeiros 40 meio-lances (20 de cada jogador)
+
+    test_positions = get_test_positions(
+        'magnus_games.pgn',
+        num_games_to_check=num_games_for_dataset,
+        max_plies_per_game=opening_depth
+    )
+
+    best_params = spsa_tune(
+        test_positions,
+        depth=search_depth_for_test,
+        iterations=optimization_iterations,
+    )
+
+    with open('optimized_constants_opening.json', 'w') as f:
+        json.dump(best_params, f, indent=2)
+    print("Os parâmetros otimizados pelo SPSA foram salvos em 'optimized_constants_opening.json'")
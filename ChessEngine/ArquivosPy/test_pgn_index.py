@@ -0,0 +1,60 @@
+# test_pgn_index.py
+import chess.pgn
+from pgn_index import PgnIndex
+
+# Partida A tem um comentário de relógio quebrado em 80 colunas: a linha seguinte começa com "["
+WRAPPED_CLOCK_PGN = """[Event "A"]
+[White "W1"]
+[Black "B1"]
+[Result "1-0"]
+
+1. e4 {
+[%clk 0:03:00]} e5 2. Nf3 {[%clk 0:02:59]
+[%eval 0.3]} Nc6 3. Bb5 ; comentário de linha com { sem fechar
+a6 1-0
+
+[Event "B"]
+[White "W2"]
+[Black "B2"]
+[Result "0-1"]
+
+1. d4 {
+[%clk 0:05:00]} d5 0-1
+"""
+
+def _write_pgn(tmp_path, text):
+    pgn_file = tmp_path / "games.pgn"
+    pgn_file.write_text(text, encoding="utf-8")
+    return str(pgn_file)
+
+def _read_game_mainlines(pgn_file):
+    """Referência: o laço de read_game usado antes do índice."""
+    mainlines = []
+    with open(pgn_file, encoding="utf-8") as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                return mainlines
+            mainlines.append((game.headers["Event"], list(game.mainline_moves())))
+
+def test_wrapped_clock_comment_does_not_split_games(tmp_path):
+    pgn_file = _write_pgn(tmp_path, WRAPPED_CLOCK_PGN)
+    index = PgnIndex.build(pgn_file)
+
+    assert len(index) == 2
+    assert [index.header(i, "Event") for i in range(len(index))] == ["A", "B"]
+    mainlines = [(headers["Event"], moves) for _, headers, moves in index.iter_mainlines(range(len(index)))]
+    assert mainlines == _read_game_mainlines(pgn_file)
+    assert [len(moves) for _, moves in mainlines] == [6, 2]
+
+def test_limit_counts_only_real_games(tmp_path):
+    pgn_file = _write_pgn(tmp_path, WRAPPED_CLOCK_PGN)
+    index = PgnIndex.build(pgn_file)
+    # Entrada falsa começando na linha "[%clk ...]}" (o que o indexador antigo criava): o trecho
+    # não tem cabeçalhos nem lances legais, então não é gerado nem conta no limite
+    phantom_offset = WRAPPED_CLOCK_PGN.encode("utf-8").index(b"[%clk 0:03:00]}")
+    index.offsets.insert(1, phantom_offset)
+    index.headers.insert(1, [''] * len(index.headers[0]))
+
+    games = list(index.iter_mainlines(range(len(index)), limit=2))
+    assert [headers["Event"] for _, headers, _ in games] == ["A", "B"]
@@ -1,5 +1,17 @@
+import argparse
+import json
+import os
+from multiprocessing import Pool
+
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+
+# Figura reaproveitada por cada processo do modo em lote (criada em _init_bulk_worker)
+_worker_figure = None
 
 def get_advantage_bar(score):
     score = max(-10, min(10, score))
@@ -10,21 +22,139 @@ def get_advantage_bar(score):
     bar = '[' + '█' * white_blocks + ' ' * black_blocks + ']'
     return bar
 
+def _draw_evaluation(ax, history_array):
+    """Desenha o gráfico de vantagem de uma partida em um eixo já existente."""
+    move_numbers = np.arange(len(history_array))
+    ax.fill_between(move_numbers, history_array, 0, where=(history_array >= 0), facecolor='lightgray', interpolate=True)
+    ax.fill_between(move_numbers, history_array, 0, where=(history_array <= 0), facecolor='dimgray', interpolate=True)
+    ax.plot(move_numbers, history_array, marker='', linestyle='-', color='royalblue', linewidth=2.5, label='Avaliação do Engine')
+    ax.axhline(0, color='black', linewidth=1.0, linestyle='--')
+    ax.set_title('Gráfico de Vantagem da Partida', fontsize=18, fontweight='bold')
+    ax.set_xlabel('Número do Meio-Lance', fontsize=12)
+    ax.set_ylabel('Pontuação (Vantagem)', fontsize=12)
+    ax.legend()
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    ax.set_ylim(-5, 5)
+    # Um rótulo por meio-lance fica ilegível (e lento) em partidas longas
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=20, integer=True))
+
 def plot_evaluation(history, filename="grafico_avaliacao.png"):
     history_array = np.array(history)
-    move_numbers = np.arange(len(history_array))
     plt.style.use('ggplot')
-    plt.figure(figsize=(14, 7))
-    plt.fill_between(move_numbers, history_array, 0, where=(history_array >= 0), facecolor='lightgray', interpolate=True)
-    plt.fill_between(move_numbers, history_array, 0, where=(history_array <= 0), facecolor='dimgray', interpolate=True)
-    plt.plot(move_numbers, history_array, marker='', linestyle='-', color='royalblue', linewidth=2.5, label='Avaliação do Engine')
-    plt.axhline(0, color='black', linewidth=1.0, linestyle='--')
-    plt.title('Gráfico de Vantagem da Partida', fontsize=18, fontweight='bold')
-    plt.xlabel('Número do Meio-Lance', fontsize=12)
-    plt.ylabel('Pontuação (Vantagem)', fontsize=12)
-    plt.legend()
-    plt.grid(True, which='both', linestyle='--', linewidth=0.5)
-    plt.ylim(-5, 5)
-    plt.xticks(move_numbers)
-    plt.savefig(filename, dpi=150)
-    print(f"\nGráfico da avaliação salvo como '{filename}'")
\ No newline at end of file
+    fig = plt.figure(figsize=(14, 7))
+    _draw_evaluation(fig.gca(), history_array)
+    fig.savefig(filename, dpi=150)
+    plt.close(fig)
+    print(f"\nGráfico da avaliação salvo como '{filename}'")
+
+def load_histories(input_file):
+    """
+    Carrega históricos de avaliação para o modo em lote.
+
+    Aceita um arquivo JSONL (uma partida por linha: uma lista de pontuações ou um objeto
+    com as chaves "history" e, opcionalmente, "id"), um .npz (um array por partida) ou
+    um .npy 2D (uma partida por linha, completada com NaN).
+    Retorna uma lista de tuplas (nome, array).
+    """
+    if input_file.endswith('.npz'):
+        with np.load(input_file) as data:
+            return [(name, np.asarray(data[name], dtype=float)) for name in data.files]
+
+    if input_file.endswith('.npy'):
+        matrix = np.atleast_2d(np.load(input_file)).astype(float)
+        return [(f"partida_{i:05d}", row[~np.isnan(row)]) for i, row in enumerate(matrix)]
+
+    histories = []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                name = str(record.get('id', f"partida_{i:05d}"))
+                history = record['history']
+            else:
+                name = f"partida_{i:05d}"
+                history = record
+            histories.append((name, np.asarray(history, dtype=float)))
+    return histories
+
+def _init_bulk_worker():
+    """Cria uma única figura Agg por processo, sem passar pelo estado global do pyplot."""
+    global _worker_figure
+    matplotlib.style.use('ggplot')
+    _worker_figure = Figure(figsize=(14, 7))
+    FigureCanvasAgg(_worker_figure)
+
+def _render_bulk_chart(job):
+    """Renderiza um gráfico reaproveitando a figura do processo."""
+    name, history_array, filename = job
+    _worker_figure.clear()
+    _draw_evaluation(_worker_figure.add_subplot(), history_array)
+    _worker_figure.savefig(filename, dpi=150)
+    return name
+
+def plot_eval_distribution(histories, filename="distribuicao_avaliacao.png"):
+    """Gráfico agregado: distribuição da avaliação por meio-lance em todo o conjunto de partidas."""
+    max_len = max(len(h) for _, h in histories)
+    lengths = np.array([len(h) for _, h in histories])
+    matrix = np.full((len(histories), max_len), np.nan)
+    # Preenchimento vetorizado: máscara das posições válidas de cada linha
+    mask = np.arange(max_len) < lengths[:, None]
+    matrix[mask] = np.concatenate([h for _, h in histories])
+
+    games_per_ply = mask.sum(axis=0)
+    p10, p25, p50, p75, p90 = np.nanpercentile(matrix, [10, 25, 50, 75, 90], axis=0)
+    plies = np.arange(max_len)
+
+    fig = Figure(figsize=(14, 7))
+    FigureCanvasAgg(fig)
+    with matplotlib.style.context('ggplot'):
+        ax = fig.add_subplot()
+        ax.fill_between(plies, p10, p90, facecolor='lightsteelblue', label='Percentis 10-90')
+        ax.fill_between(plies, p25, p75, facecolor='cornflowerblue', label='Percentis 25-75')
+        ax.plot(plies, p50, color='navy', linewidth=2.0, label='Mediana')
+        ax.axhline(0, color='black', linewidth=1.0, linestyle='--')
+        ax.set_title(f'Distribuição da Avaliação por Meio-Lance ({len(histories)} partidas)', fontsize=18, fontweight='bold')
+        ax.set_xlabel('Número do Meio-Lance', fontsize=12)
+        ax.set_ylabel('Pontuação (Vantagem)', fontsize=12)
+        ax.set_ylim(-5, 5)
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=20, integer=True))
+        ax.legend(loc='upper left')
+
+        counts_ax = ax.twinx()
+        counts_ax.plot(plies, games_per_ply, color='gray', linewidth=1.0, linestyle=':')
+        counts_ax.set_ylabel('Partidas', fontsize=12)
+        counts_ax.grid(False)
+        fig.savefig(filename, dpi=150)
+    print(f"Gráfico agregado salvo como '{filename}'")
+
+def generate_bulk_reports(input_file, output_dir="graficos", processes=None, aggregate=False):
+    """Gera em paralelo um gráfico por partida a partir de um JSONL/NumPy, usando o backend Agg."""
+    histories = load_histories(input_file)
+    if not histories:
+        print(f"Nenhum histórico encontrado em '{input_file}'.")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(name, history, os.path.join(output_dir, f"{name}.png")) for name, history in histories]
+    print(f"Gerando {len(jobs)} gráficos em '{output_dir}'...")
+
+    with Pool(processes=processes, initializer=_init_bulk_worker) as pool:
+        for done, _ in enumerate(pool.imap_unordered(_render_bulk_chart, jobs, chunksize=16), start=1):
+            if done % 500 == 0:
+                print(f"{done}/{len(jobs)} gráficos gerados...")
+
+    print(f"{len(jobs)} gráficos salvos em '{output_dir}'.")
+    if aggregate:
+        plot_eval_distribution(histories, os.path.join(output_dir, "distribuicao_avaliacao.png"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geração em lote de gráficos de avaliação.")
+    parser.add_argument("input_file", help="Arquivo .jsonl, .npy ou .npz com os históricos de avaliação")
+    parser.add_argument("--output-dir", default="graficos")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--aggregate", action="store_true", help="Gera também o gráfico de distribuição por meio-lance")
+    args = parser.parse_args()
+    generate_bulk_reports(args.input_file, args.output_dir, args.processes, args.aggregate)